@@ -6,9 +6,14 @@ Interactive dashboard for Q1-Q2 2025 sales analysis.
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import io
 import os
+import tempfile
 
 # =============================================================================
 # PAGE CONFIGURATION
@@ -25,21 +30,97 @@ st.set_page_config(
 # DATA LOADING
 # =============================================================================
 
-@st.cache_data
-def load_data():
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(SCRIPT_DIR, "urbanmart_sales.csv")
+PARQUET_PATH = os.path.join(SCRIPT_DIR, "urbanmart_sales.parquet")
+
+def data_version():
+    """Modification time of the newest source: the CSV or this script."""
+    return max(os.path.getmtime(DATA_PATH), os.path.getmtime(__file__))
+
+# Only the current data version is ever requested, so one entry is enough
+@st.cache_data(show_spinner="Loading sales data...", max_entries=1)
+def load_data(source_mtime):
     """Load and prepare sales data."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    filepath = os.path.join(script_dir, "urbanmart_sales.csv")
-    
-    df = pd.read_csv(filepath)
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Derived columns
-    df['line_revenue'] = (df['quantity'] * df['unit_price']) - df['discount_applied']
-    df['month'] = df['date'].dt.to_period('M').astype(str)
-    df['month_name'] = df['date'].dt.strftime('%B %Y')
-    df['day_of_week'] = df['date'].dt.day_name()
-    df['week'] = df['date'].dt.isocalendar().week
+    filepath = DATA_PATH
+    parquet_path = PARQUET_PATH
+    
+    # The prepared frame is baked to Parquet so cold starts skip CSV parsing;
+    # it is rebuilt whenever the CSV or this script is newer than the copy
+    if (os.path.exists(parquet_path) and
+            os.path.getmtime(parquet_path) >= source_mtime):
+        try:
+            return pd.read_parquet(parquet_path)
+        except (OSError, pa.ArrowInvalid):
+            # A damaged copy is rebuilt from the CSV below
+            pass
+    
+    # Column types are fixed at parse time: low-cardinality strings as
+    # categoricals (int-coded groupby and filtering), and narrow numerics,
+    # which comfortably fit retail quantities and prices. quantity is
+    # parsed as float so a blank cell reads as NaN, then narrowed below
+    df = pd.read_csv(
+        filepath,
+        engine='pyarrow',
+        parse_dates=['date'],
+        dtype={
+            'store_id': 'category',
+            'store_location': 'category',
+            'channel': 'category',
+            'product_category': 'category',
+            'customer_segment': 'category',
+            'payment_method': 'category',
+            'quantity': 'float32',
+            'unit_price': 'float32',
+            'discount_applied': 'float32'
+        }
+    )
+    # Rows without a valid date never pass the date-range filter, so they
+    # are dropped once here, before any date-derived column is built
+    df = df.dropna(subset=['date'])
+    df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    
+    # Integer codes for the ID columns that are counted with nunique
+    df['bill_code'] = pd.factorize(df['bill_id'])[0]
+    df['cust_code'] = pd.factorize(df['customer_id'])[0]
+    
+    # Derived columns (line_revenue as one float32 buffer, discount
+    # subtracted in place)
+    line_revenue = df['quantity'].to_numpy(dtype=np.float32) * df['unit_price'].to_numpy()
+    line_revenue -= df['discount_applied'].to_numpy()
+    # Blank numeric cells count as zero, as the NaN-skipping sums treated them
+    line_revenue[np.isnan(line_revenue)] = 0
+    df['line_revenue'] = line_revenue
+    df['quantity'] = df['quantity'].fillna(0).astype('int16')
+    df['discount_applied'] = df['discount_applied'].fillna(0)
+    
+    # Month columns are categoricals built from an integer month key
+    # (year * 12 + month - 1): labels are formatted once per month instead
+    # of once per row, and sorted keys keep the categories chronological.
+    # Keys come from valid dates only; a NaT date would get code -1 (NaN)
+    has_date = df['date'].notna().to_numpy()
+    month_key = df['date'].dt.year.to_numpy() * 12 + df['date'].dt.month.to_numpy() - 1
+    keys, valid_codes = np.unique(month_key[has_date].astype(np.int64), return_inverse=True)
+    month_codes = np.full(len(df), -1, dtype=np.int64)
+    month_codes[has_date] = valid_codes
+    month_starts = pd.to_datetime(pd.DataFrame({'year': keys // 12, 'month': keys % 12 + 1, 'day': 1}))
+    df['month'] = pd.Categorical.from_codes(month_codes, categories=month_starts.dt.strftime('%Y-%m'))
+    df['month_name'] = pd.Categorical.from_codes(month_codes, categories=month_starts.dt.strftime('%B %Y'))
+    df['dow'] = df['date'].dt.dayofweek.astype('int8')  # Monday = 0
+    
+    # Written to a temporary file and renamed into place, so a concurrent
+    # load never reads a half-written copy
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=SCRIPT_DIR, prefix='urbanmart_sales.parquet.',
+                                        suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            df.to_parquet(f, compression='zstd', index=False)
+        os.replace(tmp_path, parquet_path)
+    except OSError:
+        # Read-only deployments simply keep loading from the CSV
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
     
     return df
 
@@ -47,159 +128,418 @@ def load_data():
 # FILTER FUNCTION
 # =============================================================================
 
-def filter_data(df, start_date, end_date, stores, channel, categories, segments):
+# Selections kept by each per-filter cache; the least recently used are
+# evicted, including any left over from an older data version
+FILTER_CACHE_ENTRIES = 32
+
+def category_mask(series, values):
+    """Boolean mask of rows whose categorical value is one of values."""
+    # Lookup table gathered by code; the last slot backs code -1 (missing),
+    # selected when NaN is among values, as with isin
+    positions = series.cat.categories.get_indexer(list(values))
+    selected = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    selected[positions[positions >= 0]] = True
+    selected[-1] = any(pd.isna(value) for value in values)
+    return selected[series.cat.codes.to_numpy()]
+
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_ENTRIES)
+def filter_data(_df, source_mtime, start_date, end_date, stores, channel, categories,
+                segments):
     """Apply filters to dataframe."""
-    filtered = df.copy()
+    df = _df
     
-    filtered = filtered[
-        (filtered['date'] >= pd.to_datetime(start_date)) &
-        (filtered['date'] <= pd.to_datetime(end_date))
-    ]
+    # load_data sorts rows by date, so the date range is a contiguous
+    # slice found by binary search instead of a full boolean mask
+    dates = df['date'].to_numpy()
+    lo = np.searchsorted(dates, np.datetime64(start_date), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end_date), side='right')
+    window = df.iloc[lo:hi]
     
+    # Remaining filters are combined into one mask and applied once
+    mask = np.ones(len(window), dtype=bool)
     if stores:
-        filtered = filtered[filtered['store_location'].isin(stores)]
+        mask &= category_mask(window['store_location'], stores)
     if channel != 'All':
-        filtered = filtered[filtered['channel'] == channel]
+        mask &= category_mask(window['channel'], (channel,))
     if categories:
-        filtered = filtered[filtered['product_category'].isin(categories)]
+        mask &= category_mask(window['product_category'], categories)
     if segments:
-        filtered = filtered[filtered['customer_segment'].isin(segments)]
+        mask &= category_mask(window['customer_segment'], segments)
     
-    return filtered
+    return window[mask]
 
 # =============================================================================
-# MAIN APPLICATION
+# AGGREGATIONS
 # =============================================================================
 
-def main():
-    # Header
-    st.title("🛒 UrbanMart Sales Dashboard")
-    st.markdown("**Q1-Q2 2025 Sales Analysis | Built with Python & Streamlit**")
-    st.markdown("---")
-    
-    # Load data
-    try:
-        df = load_data()
-    except FileNotFoundError:
-        st.error("❌ 'urbanmart_sales.csv' not found!")
-        st.stop()
+def group_revenue(df, col):
+    """Sum line_revenue per value of a categorical column, via np.bincount."""
+    categories = df[col].cat.categories
+    codes = df[col].cat.codes.to_numpy()
+    # Code -1 marks a missing value; like groupby, leave that group out
+    valid = codes >= 0
+    codes = codes[valid]
+    totals = np.bincount(codes, weights=df['line_revenue'].to_numpy()[valid],
+                         minlength=len(categories))
+    present = np.bincount(codes, minlength=len(categories)) > 0
+    return pd.Series(totals[present], index=categories[present].rename(col),
+                     name='line_revenue')
+
+def count_distinct(codes):
+    """Count distinct values in an array of dense int codes, ignoring -1 (missing)."""
+    return int(np.count_nonzero(np.bincount(codes[codes >= 0])))
+
+def top_revenue(df, col, n=10):
+    """Return the n values of col with the highest total line_revenue."""
+    codes, uniques = pd.factorize(df[col])
+    valid = codes >= 0  # factorize codes missing values as -1
+    totals = np.bincount(codes[valid], weights=df['line_revenue'].to_numpy()[valid],
+                         minlength=len(uniques))
+    if len(totals) > n:
+        # Every value tied with the n-th total stays a candidate, so ties at
+        # the cut are decided by the explicit order below, not by partition
+        top = np.flatnonzero(totals >= np.partition(totals, -n)[-n])
+    else:
+        top = np.arange(len(totals))
+    # Highest revenue first; equal totals are ordered by value, ascending
+    top = top[np.lexsort((np.asarray(uniques[top], dtype=str), -totals[top]))][:n]
+    return pd.Series(totals[top], index=pd.Index(uniques[top], name=col),
+                     name='line_revenue')
+
+def compute_store_summary(df):
+    """Build the per-store performance table, sorted by revenue."""
+    stores = df['store_location'].cat.categories
+    codes = df['store_location'].cat.codes.to_numpy().astype(np.int64)
+    # Rows with a missing store (code -1) belong to no store row
+    valid = codes >= 0
+    codes = codes[valid]
+    n = len(stores)
+    present = np.bincount(codes, minlength=n) > 0
+    
+    def total(col):
+        return np.bincount(codes, weights=df[col].to_numpy()[valid], minlength=n)[present]
+    
+    # Distinct ids per store, counted as unique (store code, id code) pairs
+    def distinct(col):
+        ids = df[col].to_numpy()[valid]
+        known = ids >= 0  # missing IDs are not counted, as in nunique
+        width = ids.max(initial=0) + 1
+        pairs = np.unique(codes[known] * width + ids[known])
+        return np.bincount(pairs // width, minlength=n)[present]
+    
+    store_summary = pd.DataFrame({
+        'Store': stores[present],
+        'Revenue': total('line_revenue'),
+        'Bills': distinct('bill_code'),
+        'Customers': distinct('cust_code'),
+        'Units': total('quantity').astype(np.int64),
+        'Discounts': total('discount_applied')
+    })
+    store_summary['Avg/Bill'] = store_summary['Revenue'] / store_summary['Bills']
+    return store_summary.sort_values('Revenue', ascending=False)
+
+def compute_kpis(df):
+    """Compute the headline KPI values for a filtered dataframe."""
+    # Accumulate totals in 64-bit so 32-bit column rounding does not build up
+    total_revenue = float(df['line_revenue'].to_numpy().sum(dtype=np.float64))
+    total_bills = count_distinct(df['bill_code'].to_numpy())
+    total_units = int(df['quantity'].to_numpy().sum(dtype=np.int64))
+    total_discount = float(df['discount_applied'].to_numpy().sum(dtype=np.float64))
+    transactions = len(df)
+    
+    return {
+        'total_revenue': total_revenue,
+        'total_bills': total_bills,
+        'avg_bill_value': total_revenue / total_bills if total_bills > 0 else 0,
+        'unique_customers': count_distinct(df['cust_code'].to_numpy()),
+        'total_units': total_units,
+        'total_discount': total_discount,
+        'transactions': transactions,
+        'avg_discount': total_discount / transactions if transactions > 0 else 0
+    }
+
+# Display names for the int8 dow codes (Monday = 0)
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Upper bound on points sent to the browser for the daily revenue line
+MAX_TREND_POINTS = 2000
+
+def downsample_lttb(x, y, n_out):
+    """Return indices of n_out points chosen by Largest-Triangle-Three-Buckets."""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        cx = x[next_lo:next_hi].mean()
+        cy = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_ENTRIES)
+def compute_aggregates(_df, filters):
+    """Compute every chart and table aggregate for a filtered dataframe."""
+    df = _df
+    aggs = {}
+    
+    monthly = df.groupby('month_name', sort=False, observed=True)
+    aggs['monthly_revenue'] = monthly['line_revenue'].sum().reset_index()
+    aggs['monthly_revenue'].columns = ['Month', 'Revenue']
+    # nunique skips NaN, so missing bills (code -1) are masked to NaN first
+    bill_codes = df['bill_code'].where(df['bill_code'] >= 0)
+    aggs['monthly_bills'] = bill_codes.groupby(
+        df['month_name'], sort=False, observed=True
+    ).nunique().reset_index()
+    aggs['monthly_bills'].columns = ['Month', 'Bills']
+    
+    aggs['store_monthly'] = df.groupby(
+        ['month_name', 'store_location'], sort=False, observed=True
+    )['line_revenue'].sum().reset_index()
+    
+    # Rows are date-sorted by load_data, so first-seen order is date order
+    daily = df.groupby('date', sort=False, observed=True)['line_revenue'].sum().reset_index()
+    if len(daily) > MAX_TREND_POINTS:
+        keep = downsample_lttb(daily['date'].to_numpy().astype(np.int64),
+                               daily['line_revenue'].to_numpy(), MAX_TREND_POINTS)
+        daily = daily.iloc[keep]
+    aggs['daily'] = daily
+    
+    # Weekday totals by int code; names are attached only for display
+    aggs['day_of_week'] = pd.Series(
+        np.bincount(df['dow'].to_numpy(), weights=df['line_revenue'].to_numpy(), minlength=7),
+        index=DAY_NAMES
+    )
     
-    # =========================================================================
-    # SIDEBAR FILTERS
-    # =========================================================================
+    for key, col in [('category', 'product_category'), ('store', 'store_location')]:
+        aggs[key] = group_revenue(df, col).sort_values(ascending=True)
     
-    st.sidebar.header("🔍 Filters")
+    for key, col in [('channel', 'channel'), ('segment', 'customer_segment'),
+                     ('payment', 'payment_method')]:
+        aggs[key] = group_revenue(df, col)
     
-    # Date Range
-    st.sidebar.subheader("📅 Date Range")
-    min_date = df['date'].min().date()
-    max_date = df['date'].max().date()
+    top_products = top_revenue(df, 'product_name').reset_index()
+    top_products.columns = ['Product', 'Revenue']
+    aggs['top_products'] = top_products
     
-    date_range = st.sidebar.date_input(
-        "Select dates:",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date
-    )
+    top_customers = top_revenue(df, 'customer_id').reset_index()
+    # First non-blank segment per customer, as agg({'customer_segment': 'first'}) gave
+    first_segment = df.dropna(subset=['customer_segment']).drop_duplicates(
+        'customer_id').set_index('customer_id')['customer_segment']
+    top_customers['Segment'] = first_segment.reindex(top_customers['customer_id']).to_numpy()
+    top_customers.columns = ['Customer', 'Revenue', 'Segment']
+    aggs['top_customers'] = top_customers
     
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-    else:
-        start_date = end_date = date_range[0]
+    aggs['store_summary'] = compute_store_summary(df)
+    aggs['kpis'] = compute_kpis(df)
     
-    # Store Filter
-    st.sidebar.subheader("🏪 Store Location")
-    all_stores = df['store_location'].unique().tolist()
-    selected_stores = st.sidebar.multiselect(
-        "Select stores:",
-        options=all_stores,
-        default=all_stores
+    return aggs
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def to_csv_bytes(df):
+    """Serialize a dataframe to UTF-8 CSV bytes with pyarrow's CSV writer."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if 'date' in table.column_names:
+        # Write plain dates, as pandas does for midnight timestamps
+        date_idx = table.schema.get_field_index('date')
+        table = table.set_column(date_idx, 'date', table.column('date').cast(pa.date32()))
+    
+    buf = io.BytesIO()
+    pacsv.write_csv(table, buf)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=FILTER_CACHE_ENTRIES)
+def filtered_csv_bytes(_df, filters):
+    """Filtered-data CSV export, cached per filter combination."""
+    export = _df.drop(columns=['bill_code', 'cust_code'])
+    # The export is a display edge: write weekday names, as the original
+    # day_of_week column did, instead of the internal int codes
+    export['dow'] = pd.Categorical.from_codes(export['dow'], categories=DAY_NAMES)
+    # float32 money columns are written as float64 cents, so the file shows
+    # 5.4 rather than the float32 artefact 5.3999996
+    for col in ['unit_price', 'discount_applied', 'line_revenue']:
+        export[col] = export[col].astype(np.float64).round(2)
+    return to_csv_bytes(export.rename(columns={'dow': 'day_of_week'}))
+
+# =============================================================================
+# CHARTS
+# =============================================================================
+
+# st.plotly_chart only serializes a figure, so cached figures are safe to share
+@st.cache_resource(show_spinner=False, max_entries=FILTER_CACHE_ENTRIES)
+def build_figures(_aggs, filters):
+    """Build every dashboard figure for one filter combination."""
+    aggs = _aggs
+    figs = {}
+    
+    # Monthly Revenue Trend
+    monthly_data = aggs['monthly_revenue']
+    
+    figs['monthly'] = go.Figure(go.Bar(
+        x=monthly_data['Month'].to_numpy(),
+        y=monthly_data['Revenue'].to_numpy(),
+        marker=dict(color=monthly_data['Revenue'].to_numpy(), colorscale='Blues')
+    ))
+    figs['monthly'].update_layout(
+        title='Monthly Revenue',
+        xaxis_title='Month',
+        yaxis_title='Revenue',
+        showlegend=False
     )
     
-    # Channel Filter
-    st.sidebar.subheader("📱 Sales Channel")
-    selected_channel = st.sidebar.selectbox(
-        "Select channel:",
-        options=['All', 'In-store', 'Online']
+    # Monthly Transactions
+    monthly_txn = aggs['monthly_bills']
+    
+    figs['bills'] = go.Figure(go.Bar(
+        x=monthly_txn['Month'].to_numpy(),
+        y=monthly_txn['Bills'].to_numpy(),
+        marker=dict(color=monthly_txn['Bills'].to_numpy(), colorscale='Greens')
+    ))
+    figs['bills'].update_layout(
+        title='Monthly Bills',
+        xaxis_title='Month',
+        yaxis_title='Bills',
+        showlegend=False
     )
     
-    # Category Filter
-    st.sidebar.subheader("📦 Product Category")
-    all_categories = df['product_category'].unique().tolist()
-    selected_categories = st.sidebar.multiselect(
-        "Select categories:",
-        options=all_categories,
-        default=all_categories
+    # Store-wise Monthly Trend
+    store_monthly = aggs['store_monthly']
+    
+    figs['store_trend'] = go.Figure()
+    for store, store_rows in store_monthly.groupby('store_location', sort=False, observed=True):
+        figs['store_trend'].add_trace(go.Scatter(
+            x=store_rows['month_name'].to_numpy(),
+            y=store_rows['line_revenue'].to_numpy(),
+            mode='lines+markers',
+            name=store
+        ))
+    figs['store_trend'].update_layout(
+        title='Monthly Revenue by Store',
+        xaxis_title='Month',
+        yaxis_title='Revenue ($)',
+        legend_title='Store'
     )
     
-    # Segment Filter
-    st.sidebar.subheader("👥 Customer Segment")
-    all_segments = df['customer_segment'].unique().tolist()
-    selected_segments = st.sidebar.multiselect(
-        "Select segments:",
-        options=all_segments,
-        default=all_segments
+    # Daily Trend
+    daily_data = aggs['daily']
+    
+    # WebGL trace: drawn on a canvas instead of one SVG node per point
+    figs['daily'] = go.Figure(go.Scattergl(
+        x=daily_data['date'].to_numpy(),
+        y=daily_data['line_revenue'].to_numpy(),
+        mode='lines',
+        line_color='#1f77b4'
+    ))
+    figs['daily'].update_layout(
+        title='Daily Revenue Trend',
+        xaxis_title='date',
+        yaxis_title='line_revenue'
     )
     
-    # Sidebar info
-    st.sidebar.markdown("---")
-    st.sidebar.info(f"📊 Data: {min_date} to {max_date}")
-    
-    # =========================================================================
-    # APPLY FILTERS
-    # =========================================================================
-    
-    df_filtered = filter_data(
-        df, start_date, end_date, selected_stores,
-        selected_channel, selected_categories, selected_segments
+    # Day of Week
+    day_data = aggs['day_of_week']
+    
+    figs['dow'] = go.Figure(go.Bar(
+        x=day_data.index.to_numpy(),
+        y=day_data.to_numpy(),
+        marker=dict(color=day_data.to_numpy(), colorscale='Oranges')
+    ))
+    figs['dow'].update_layout(
+        title='Revenue by Day of Week',
+        xaxis_title='Day',
+        yaxis_title='Revenue ($)',
+        showlegend=False,
+        xaxis_tickangle=-45
     )
     
-    if df_filtered.empty:
-        st.warning("⚠️ No data for selected filters!")
-        st.stop()
-    
-    # =========================================================================
-    # KPI METRICS
-    # =========================================================================
+    # By Category and By Store
+    for key, label, colorscale in [('category', 'Category', 'Viridis'),
+                                   ('store', 'Store', 'Greens')]:
+        data = aggs[key]
+        
+        figs[key] = go.Figure(go.Bar(
+            x=data.to_numpy(),
+            y=data.index.to_numpy(),
+            orientation='h',
+            marker=dict(color=data.to_numpy(), colorscale=colorscale)
+        ))
+        figs[key].update_layout(
+            title=f'Revenue by {label}',
+            xaxis_title='Revenue ($)',
+            yaxis_title=label,
+            showlegend=False
+        )
     
+    # Channel, Segment and Payment Distribution
+    for key, label, colors in [('channel', 'Channel', ['#2ecc71', '#3498db']),
+                               ('segment', 'Segment', px.colors.qualitative.Pastel),
+                               ('payment', 'Payment', px.colors.qualitative.Set3)]:
+        data = aggs[key]
+        
+        figs[key] = go.Figure(go.Pie(
+            values=data.to_numpy(),
+            labels=data.index.to_numpy(),
+            marker_colors=colors
+        ))
+        figs[key].update_traces(textposition='inside', textinfo='percent+label')
+        figs[key].update_layout(title=f'Revenue by {label}', showlegend=False)
+    
+    return figs
+
+# =============================================================================
+# DASHBOARD SECTIONS
+# =============================================================================
+
+# Table values stay numeric; Streamlit formats them in the browser
+CURRENCY_COLUMN = st.column_config.NumberColumn(format="$%,.2f")
+COUNT_COLUMN = st.column_config.NumberColumn(format="%,d")
+
+def render_kpis(kpis):
+    """Render the KPI metric cards."""
     st.header("📊 Key Performance Indicators")
     
-    total_revenue = df_filtered['line_revenue'].sum()
-    total_bills = df_filtered['bill_id'].nunique()
-    avg_bill_value = total_revenue / total_bills if total_bills > 0 else 0
-    unique_customers = df_filtered['customer_id'].nunique()
-    total_units = df_filtered['quantity'].sum()
-    total_discount = df_filtered['discount_applied'].sum()
-    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("💰 Total Revenue", f"${total_revenue:,.2f}")
+        st.metric("💰 Total Revenue", f"${kpis['total_revenue']:,.2f}")
     with col2:
-        st.metric("🧾 Total Bills", f"{total_bills:,}")
+        st.metric("🧾 Total Bills", f"{kpis['total_bills']:,}")
     with col3:
-        st.metric("📈 Avg Bill Value", f"${avg_bill_value:,.2f}")
+        st.metric("📈 Avg Bill Value", f"${kpis['avg_bill_value']:,.2f}")
     with col4:
-        st.metric("👥 Unique Customers", f"{unique_customers:,}")
+        st.metric("👥 Unique Customers", f"{kpis['unique_customers']:,}")
     
     col5, col6, col7, col8 = st.columns(4)
     
     with col5:
-        st.metric("📦 Units Sold", f"{total_units:,}")
+        st.metric("📦 Units Sold", f"{kpis['total_units']:,}")
     with col6:
-        st.metric("🏷️ Total Discounts", f"${total_discount:,.2f}")
+        st.metric("🏷️ Total Discounts", f"${kpis['total_discount']:,.2f}")
     with col7:
-        st.metric("📋 Transactions", f"{len(df_filtered):,}")
+        st.metric("📋 Transactions", f"{kpis['transactions']:,}")
     with col8:
-        avg_discount = total_discount / len(df_filtered) if len(df_filtered) > 0 else 0
-        st.metric("💵 Avg Discount", f"${avg_discount:,.2f}")
+        st.metric("💵 Avg Discount", f"${kpis['avg_discount']:,.2f}")
     
     st.markdown("---")
-    
-    # =========================================================================
-    # TREND ANALYSIS
-    # =========================================================================
-    
+
+def render_trends(figs):
+    """Render the monthly and daily trend charts."""
     st.header("📈 Trend Analysis")
     
     tab1, tab2 = st.tabs(["📅 Monthly Trends", "📆 Daily Patterns"])
@@ -208,276 +548,120 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            # Monthly Revenue Trend
-            monthly_data = df_filtered.groupby('month_name')['line_revenue'].sum().reset_index()
-            monthly_data.columns = ['Month', 'Revenue']
-            
-            fig_monthly = px.bar(
-                monthly_data,
-                x='Month',
-                y='Revenue',
-                title='Monthly Revenue',
-                color='Revenue',
-                color_continuous_scale='Blues'
-            )
-            fig_monthly.update_layout(showlegend=False, coloraxis_showscale=False)
-            st.plotly_chart(fig_monthly, use_container_width=True)
+            st.plotly_chart(figs['monthly'], use_container_width=True)
         
         with col2:
-            # Monthly Transactions
-            monthly_txn = df_filtered.groupby('month_name')['bill_id'].nunique().reset_index()
-            monthly_txn.columns = ['Month', 'Bills']
-            
-            fig_txn = px.bar(
-                monthly_txn,
-                x='Month',
-                y='Bills',
-                title='Monthly Bills',
-                color='Bills',
-                color_continuous_scale='Greens'
-            )
-            fig_txn.update_layout(showlegend=False, coloraxis_showscale=False)
-            st.plotly_chart(fig_txn, use_container_width=True)
+            st.plotly_chart(figs['bills'], use_container_width=True)
         
-        # Store-wise Monthly Trend
-        store_monthly = df_filtered.groupby(['month_name', 'store_location'])['line_revenue'].sum().reset_index()
-        
-        fig_store_trend = px.line(
-            store_monthly,
-            x='month_name',
-            y='line_revenue',
-            color='store_location',
-            title='Monthly Revenue by Store',
-            markers=True
-        )
-        fig_store_trend.update_layout(
-            xaxis_title='Month',
-            yaxis_title='Revenue ($)',
-            legend_title='Store'
-        )
-        st.plotly_chart(fig_store_trend, use_container_width=True)
+        st.plotly_chart(figs['store_trend'], use_container_width=True)
     
     with tab2:
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Daily Trend
-            daily_data = df_filtered.groupby('date')['line_revenue'].sum().reset_index()
-            
-            fig_daily = px.line(
-                daily_data,
-                x='date',
-                y='line_revenue',
-                title='Daily Revenue Trend'
-            )
-            fig_daily.update_traces(line_color='#1f77b4')
-            st.plotly_chart(fig_daily, use_container_width=True)
+            st.plotly_chart(figs['daily'], use_container_width=True)
         
         with col2:
-            # Day of Week
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            day_data = df_filtered.groupby('day_of_week')['line_revenue'].sum().reindex(day_order)
-            
-            fig_dow = px.bar(
-                x=day_data.index,
-                y=day_data.values,
-                title='Revenue by Day of Week',
-                color=day_data.values,
-                color_continuous_scale='Oranges'
-            )
-            fig_dow.update_layout(
-                xaxis_title='Day',
-                yaxis_title='Revenue ($)',
-                showlegend=False,
-                coloraxis_showscale=False,
-                xaxis_tickangle=-45
-            )
-            st.plotly_chart(fig_dow, use_container_width=True)
+            st.plotly_chart(figs['dow'], use_container_width=True)
     
     st.markdown("---")
-    
-    # =========================================================================
-    # REVENUE BREAKDOWN
-    # =========================================================================
-    
+
+def render_breakdown(figs):
+    """Render revenue by category and by store."""
     st.header("💰 Revenue Breakdown")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # By Category
-        cat_data = df_filtered.groupby('product_category')['line_revenue'].sum().sort_values(ascending=True)
-        
-        fig_cat = px.bar(
-            x=cat_data.values,
-            y=cat_data.index,
-            orientation='h',
-            title='Revenue by Category',
-            color=cat_data.values,
-            color_continuous_scale='Viridis'
-        )
-        fig_cat.update_layout(
-            xaxis_title='Revenue ($)',
-            yaxis_title='Category',
-            showlegend=False,
-            coloraxis_showscale=False
-        )
-        st.plotly_chart(fig_cat, use_container_width=True)
+        st.plotly_chart(figs['category'], use_container_width=True)
     
     with col2:
-        # By Store
-        store_data = df_filtered.groupby('store_location')['line_revenue'].sum().sort_values(ascending=True)
-        
-        fig_store = px.bar(
-            x=store_data.values,
-            y=store_data.index,
-            orientation='h',
-            title='Revenue by Store',
-            color=store_data.values,
-            color_continuous_scale='Greens'
-        )
-        fig_store.update_layout(
-            xaxis_title='Revenue ($)',
-            yaxis_title='Store',
-            showlegend=False,
-            coloraxis_showscale=False
-        )
-        st.plotly_chart(fig_store, use_container_width=True)
+        st.plotly_chart(figs['store'], use_container_width=True)
     
     st.markdown("---")
-    
-    # =========================================================================
-    # DISTRIBUTION ANALYSIS
-    # =========================================================================
-    
+
+def render_distribution(figs):
+    """Render the channel, segment and payment pie charts."""
     st.header("📊 Distribution Analysis")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        # Channel Distribution
-        channel_data = df_filtered.groupby('channel')['line_revenue'].sum()
-        
-        fig_channel = px.pie(
-            values=channel_data.values,
-            names=channel_data.index,
-            title='Revenue by Channel',
-            color_discrete_sequence=['#2ecc71', '#3498db']
-        )
-        fig_channel.update_traces(textposition='inside', textinfo='percent+label')
-        fig_channel.update_layout(showlegend=False)
-        st.plotly_chart(fig_channel, use_container_width=True)
+        st.plotly_chart(figs['channel'], use_container_width=True)
     
     with col2:
-        # Segment Distribution
-        segment_data = df_filtered.groupby('customer_segment')['line_revenue'].sum()
-        
-        fig_segment = px.pie(
-            values=segment_data.values,
-            names=segment_data.index,
-            title='Revenue by Segment',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig_segment.update_traces(textposition='inside', textinfo='percent+label')
-        fig_segment.update_layout(showlegend=False)
-        st.plotly_chart(fig_segment, use_container_width=True)
+        st.plotly_chart(figs['segment'], use_container_width=True)
     
     with col3:
-        # Payment Distribution
-        payment_data = df_filtered.groupby('payment_method')['line_revenue'].sum()
-        
-        fig_payment = px.pie(
-            values=payment_data.values,
-            names=payment_data.index,
-            title='Revenue by Payment',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_payment.update_traces(textposition='inside', textinfo='percent+label')
-        fig_payment.update_layout(showlegend=False)
-        st.plotly_chart(fig_payment, use_container_width=True)
+        st.plotly_chart(figs['payment'], use_container_width=True)
     
     st.markdown("---")
-    
-    # =========================================================================
-    # TOP PERFORMERS
-    # =========================================================================
-    
+
+def render_top_performers(aggs):
+    """Render the top products and top customers tables."""
     st.header("🏆 Top Performers")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Top 10 Products")
-        top_products = df_filtered.groupby('product_name')['line_revenue'].sum().sort_values(ascending=False).head(10).reset_index()
-        top_products.columns = ['Product', 'Revenue']
-        top_products['Revenue'] = top_products['Revenue'].apply(lambda x: f"${x:,.2f}")
+        top_products = aggs['top_products']
         top_products.index = range(1, len(top_products) + 1)
-        st.dataframe(top_products, use_container_width=True)
+        st.dataframe(top_products, use_container_width=True,
+                     column_config={'Revenue': CURRENCY_COLUMN})
     
     with col2:
         st.subheader("Top 10 Customers")
-        top_customers = df_filtered.groupby('customer_id').agg({
-            'line_revenue': 'sum',
-            'customer_segment': 'first'
-        }).sort_values('line_revenue', ascending=False).head(10).reset_index()
-        top_customers.columns = ['Customer', 'Revenue', 'Segment']
-        top_customers['Revenue'] = top_customers['Revenue'].apply(lambda x: f"${x:,.2f}")
+        top_customers = aggs['top_customers']
         top_customers.index = range(1, len(top_customers) + 1)
-        st.dataframe(top_customers, use_container_width=True)
+        st.dataframe(top_customers, use_container_width=True,
+                     column_config={'Revenue': CURRENCY_COLUMN})
     
     st.markdown("---")
-    
-    # =========================================================================
-    # STORE PERFORMANCE TABLE
-    # =========================================================================
-    
+
+def render_store_summary(aggs):
+    """Render the store performance summary table."""
     st.header("🏪 Store Performance Summary")
     
-    store_summary = df_filtered.groupby('store_location').agg({
-        'line_revenue': 'sum',
-        'bill_id': 'nunique',
-        'customer_id': 'nunique',
-        'quantity': 'sum',
-        'discount_applied': 'sum'
-    }).reset_index()
-    
-    store_summary.columns = ['Store', 'Revenue', 'Bills', 'Customers', 'Units', 'Discounts']
-    store_summary['Avg/Bill'] = store_summary['Revenue'] / store_summary['Bills']
-    store_summary = store_summary.sort_values('Revenue', ascending=False)
-    
-    # Format for display
-    display_summary = store_summary.copy()
-    display_summary['Revenue'] = display_summary['Revenue'].apply(lambda x: f"${x:,.2f}")
-    display_summary['Avg/Bill'] = display_summary['Avg/Bill'].apply(lambda x: f"${x:,.2f}")
-    display_summary['Discounts'] = display_summary['Discounts'].apply(lambda x: f"${x:,.2f}")
-    display_summary['Bills'] = display_summary['Bills'].apply(lambda x: f"{x:,}")
-    display_summary['Customers'] = display_summary['Customers'].apply(lambda x: f"{x:,}")
-    display_summary['Units'] = display_summary['Units'].apply(lambda x: f"{x:,}")
-    
-    st.dataframe(display_summary, use_container_width=True, hide_index=True)
+    store_summary = aggs['store_summary']
+    
+    st.dataframe(
+        store_summary,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Revenue': CURRENCY_COLUMN,
+            'Avg/Bill': CURRENCY_COLUMN,
+            'Discounts': CURRENCY_COLUMN,
+            'Bills': COUNT_COLUMN,
+            'Customers': COUNT_COLUMN,
+            'Units': COUNT_COLUMN
+        }
+    )
     
     st.markdown("---")
-    
-    # =========================================================================
-    # DATA PREVIEW & DOWNLOAD
-    # =========================================================================
-    
+
+# A fragment, so clicking a download button reruns only this section
+@st.fragment
+def render_export(df_filtered, filters, kpis):
+    """Render the data preview and download buttons."""
     st.header("📄 Data Preview & Export")
     
     with st.expander("View Filtered Data (First 50 rows)"):
         display_cols = ['transaction_id', 'date', 'store_location', 'customer_id',
                        'product_name', 'product_category', 'quantity', 'unit_price',
                        'discount_applied', 'line_revenue', 'channel', 'payment_method']
-        st.dataframe(df_filtered[display_cols].head(50), use_container_width=True)
+        # Slice rows before projecting, so only 50 rows are ever copied
+        st.dataframe(df_filtered.iloc[:50][display_cols], use_container_width=True)
     
     # Download buttons
     col1, col2 = st.columns(2)
     
     with col1:
-        csv_data = df_filtered.to_csv(index=False).encode('utf-8')
+        # Serialized only when the button is clicked, not on every rerun
         st.download_button(
             label="📥 Download Filtered Data (CSV)",
-            data=csv_data,
+            data=lambda: filtered_csv_bytes(df_filtered, filters),
             file_name="urbanmart_filtered_data.csv",
             mime="text/csv"
         )
@@ -486,8 +670,9 @@ def main():
         # Summary report
         summary = pd.DataFrame({
             'Metric': ['Total Revenue', 'Total Bills', 'Unique Customers', 'Units Sold', 'Total Discounts'],
-            'Value': [f"${total_revenue:,.2f}", f"{total_bills:,}", f"{unique_customers:,}", 
-                     f"{total_units:,}", f"${total_discount:,.2f}"]
+            'Value': [f"${kpis['total_revenue']:,.2f}", f"{kpis['total_bills']:,}",
+                     f"{kpis['unique_customers']:,}", f"{kpis['total_units']:,}",
+                     f"${kpis['total_discount']:,.2f}"]
         })
         summary_csv = summary.to_csv(index=False).encode('utf-8')
         st.download_button(
@@ -496,6 +681,121 @@ def main():
             file_name="urbanmart_summary.csv",
             mime="text/csv"
         )
+
+# =============================================================================
+# MAIN APPLICATION
+# =============================================================================
+
+def main():
+    # Header
+    st.title("🛒 UrbanMart Sales Dashboard")
+    st.markdown("**Q1-Q2 2025 Sales Analysis | Built with Python & Streamlit**")
+    st.markdown("---")
+    
+    # Load data
+    try:
+        source_mtime = data_version()
+        df = load_data(source_mtime)
+    except FileNotFoundError:
+        st.error("❌ 'urbanmart_sales.csv' not found!")
+        st.stop()
+    
+    # =========================================================================
+    # SIDEBAR FILTERS
+    # =========================================================================
+    
+    st.sidebar.header("🔍 Filters")
+    
+    # Date Range
+    st.sidebar.subheader("📅 Date Range")
+    min_date = df['date'].min().date()
+    max_date = df['date'].max().date()
+    
+    date_range = st.sidebar.date_input(
+        "Select dates:",
+        value=(min_date, max_date),
+        min_value=min_date,
+        max_value=max_date
+    )
+    
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+    else:
+        start_date = end_date = date_range[0]
+    
+    # Store Filter
+    st.sidebar.subheader("🏪 Store Location")
+    all_stores = df['store_location'].unique().tolist()
+    selected_stores = st.sidebar.multiselect(
+        "Select stores:",
+        options=all_stores,
+        default=all_stores
+    )
+    
+    # Channel Filter
+    st.sidebar.subheader("📱 Sales Channel")
+    selected_channel = st.sidebar.selectbox(
+        "Select channel:",
+        options=['All', 'In-store', 'Online']
+    )
+    
+    # Category Filter
+    st.sidebar.subheader("📦 Product Category")
+    all_categories = df['product_category'].unique().tolist()
+    selected_categories = st.sidebar.multiselect(
+        "Select categories:",
+        options=all_categories,
+        default=all_categories
+    )
+    
+    # Segment Filter
+    st.sidebar.subheader("👥 Customer Segment")
+    all_segments = df['customer_segment'].unique().tolist()
+    selected_segments = st.sidebar.multiselect(
+        "Select segments:",
+        options=all_segments,
+        default=all_segments
+    )
+    
+    # Sidebar info
+    st.sidebar.markdown("---")
+    st.sidebar.info(f"📊 Data: {min_date} to {max_date}")
+    
+    # =========================================================================
+    # APPLY FILTERS
+    # =========================================================================
+    
+    # Every per-filter cache (filter_data, compute_aggregates, build_figures,
+    # filtered_csv_bytes) is keyed on this tuple and takes the frame as an
+    # underscore argument, so the frame itself is never hashed. The data
+    # version (newest mtime of the CSV and this script) leads the key, so
+    # editing either never serves results cached for the old sources.
+    # Selections are sorted by str because a blank cell puts a float NaN
+    # among the string options
+    filters = (
+        source_mtime, start_date, end_date,
+        tuple(sorted(selected_stores, key=str)), selected_channel,
+        tuple(sorted(selected_categories, key=str)),
+        tuple(sorted(selected_segments, key=str))
+    )
+    df_filtered = filter_data(df, *filters)
+    
+    if df_filtered.empty:
+        st.warning("⚠️ No data for selected filters!")
+        st.stop()
+    
+    aggs = compute_aggregates(df_filtered, filters)
+    
+    figs = build_figures(aggs, filters)
+    kpis = aggs['kpis']
+    
+    render_kpis(kpis)
+    render_trends(figs)
+    render_breakdown(figs)
+    render_distribution(figs)
+    render_top_performers(aggs)
+    render_store_summary(aggs)
+    render_export(df_filtered, filters, kpis)
     
     # Footer
     st.markdown("---")